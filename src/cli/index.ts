@@ -13,9 +13,9 @@
 import { Command } from 'commander';
 import chalk from 'chalk';
 import * as p from '@clack/prompts';
-import { Storage } from '../storage/database.js';
+import { closeSharedStorage, getSharedStorage, type Storage } from '../storage/database.js';
 import { CommunicationAgent, type AgentConfig } from '../core/agent.js';
-import type { OrgContext, LLMConfig } from '../core/types.js';
+import type { OrgContext, LLMConfig, RequestStatus } from '../core/types.js';
 import dotenv from 'dotenv';
 import { createInterface } from 'readline';
 import { existsSync, readFileSync, writeFileSync, mkdirSync, rmSync } from 'fs';
@@ -50,6 +50,14 @@ const LOGO = `
    ╚═════╝ ╚═════╝ ╚═╝     ╚═╝╚═╝     ╚═╝
 `;
 
+const REQUEST_STATUS_ICONS: Record<RequestStatus, string> = {
+  pending: '📨',
+  in_progress: '📨',
+  waiting_response: '⏳',
+  completed: '📨',
+  cancelled: '📨',
+};
+
 function printBanner(): void {
   console.log(chalk.cyan(LOGO));
   console.log(chalk.gray('  AI-first communication proxy'));
@@ -94,6 +102,21 @@ function saveConfig(config: CLIConfig): void {
   writeFileSync(CONFIG_PATH, JSON.stringify(config, null, 2));
 }
 
+// Opened on first use and shared for the rest of the process, so setup handing
+// off to chat doesn't open the database and re-run the schema twice
+function getStorage(): Storage {
+  return getSharedStorage(DB_PATH);
+}
+
+// Delete all local state. The shared Storage is closed first so later
+// getStorage() calls create a new database instead of writing to the deleted one
+function resetConfigDir(): void {
+  closeSharedStorage(DB_PATH);
+  if (existsSync(CONFIG_DIR)) {
+    rmSync(CONFIG_DIR, { recursive: true });
+  }
+}
+
 function isConfigured(): boolean {
   const config = loadConfig();
   return !!(config?.userId && config?.apiKey);
@@ -141,9 +164,7 @@ async function runSetupWizard(): Promise<void> {
         process.exit(0);
       }
 
-      if (existsSync(CONFIG_DIR)) {
-        rmSync(CONFIG_DIR, { recursive: true });
-      }
+      resetConfigDir();
     }
   }
 
@@ -280,13 +301,17 @@ async function runSetupWizard(): Promise<void> {
   await sleep(500); // Brief pause for effect
   
   ensureConfigDir();
-  const storage = new Storage(DB_PATH);
+  const storage = getStorage();
   
-  const user = storage.createUser({ name: String(userName) });
-  storage.createAgent({
-    userId: user.id,
-    name: `${user.name}'s Agent`,
-    status: 'active',
+  // User and agent are written together so a failure can't leave an agentless user
+  const user = storage.transaction(() => {
+    const created = storage.createUser({ name: String(userName) });
+    storage.createAgent({
+      userId: created.id,
+      name: `${created.name}'s Agent`,
+      status: 'active',
+    });
+    return created;
   });
 
   const config: CLIConfig = {
@@ -339,16 +364,18 @@ async function startChat(): Promise<void> {
     return;
   }
 
-  const storage = new Storage(DB_PATH);
-  const user = storage.getUser(config.userId);
-  const agentRecord = storage.getAgentByUserId(config.userId);
+  const storage = getStorage();
+  const found = storage.getUserWithAgent(config.userId);
   
-  if (!user || !agentRecord) {
+  if (!found?.agent) {
     console.log(chalk.yellow('User not found. Running setup...\n'));
     await runSetupWizard();
     return;
   }
 
+  const user = found.user;
+  const agentRecord = found.agent;
+
   const llmConfig: LLMConfig = {
     provider: config.llmProvider,
     model: config.llmModel,
@@ -478,7 +505,7 @@ program
       return;
     }
 
-    const storage = new Storage(DB_PATH);
+    const storage = getStorage();
     const tasks = storage.getTasksForUser(config.userId, 'pending');
     
     console.log(chalk.cyan('\n📥 Pending Tasks\n'));
@@ -488,9 +515,10 @@ program
       return;
     }
 
+    const requesters = storage.getRequesterNamesByRequestIds(tasks.map(t => t.requestId));
+
     tasks.forEach((t, i) => {
-      const request = storage.getRequest(t.requestId);
-      const from = request?.fromUserId ? storage.getUser(request.fromUserId)?.name : 'Unknown';
+      const from = requesters.get(t.requestId) ?? 'Unknown';
       console.log(`  ${chalk.bold(`${i + 1}.`)} ${t.title}`);
       console.log(`     ${chalk.gray(`from ${from}`)}`);
       if (t.description) console.log(`     ${chalk.gray(t.description)}`);
@@ -509,9 +537,8 @@ program
       return;
     }
 
-    const storage = new Storage(DB_PATH);
-    const requests = storage.getRequestsByFromUser(config.userId);
-    const active = requests.filter(r => r.status !== 'completed' && r.status !== 'cancelled');
+    const storage = getStorage();
+    const active = storage.getActiveRequestsByFromUser(config.userId);
     
     console.log(chalk.cyan('\n📤 Active Requests\n'));
     
@@ -520,10 +547,11 @@ program
       return;
     }
 
+    const targets = storage.getUsersByIds(active.flatMap(r => (r.toUserId ? [r.toUserId] : [])));
+
     active.forEach(r => {
-      const target = r.toUserId ? storage.getUser(r.toUserId)?.name : 'Unassigned';
-      const statusIcon = r.status === 'waiting_response' ? '⏳' : '📨';
-      console.log(`  ${statusIcon} ${chalk.bold(r.subject)}`);
+      const target = r.toUserId ? targets.get(r.toUserId)?.name : 'Unassigned';
+      console.log(`  ${REQUEST_STATUS_ICONS[r.status]} ${chalk.bold(r.subject)}`);
       console.log(`     ${chalk.gray(`→ ${target} (${r.status})`)}\n`);
     });
   });
@@ -562,20 +590,23 @@ program
       placeholder: 'e.g., frontend, react, design',
     });
 
-    const storage = new Storage(DB_PATH);
-    const user = storage.createUser({
-      name: String(name),
-      role: role && !p.isCancel(role) ? String(role) : undefined,
-      team: team && !p.isCancel(team) ? String(team) : undefined,
-      expertise: expertise && !p.isCancel(expertise) 
-        ? String(expertise).split(',').map(s => s.trim()).filter(Boolean) 
-        : undefined,
-    });
+    const storage = getStorage();
+    const user = storage.transaction(() => {
+      const created = storage.createUser({
+        name: String(name),
+        role: role && !p.isCancel(role) ? String(role) : undefined,
+        team: team && !p.isCancel(team) ? String(team) : undefined,
+        expertise: expertise && !p.isCancel(expertise) 
+          ? String(expertise).split(',').map(s => s.trim()).filter(Boolean) 
+          : undefined,
+      });
 
-    storage.createAgent({
-      userId: user.id,
-      name: `${user.name}'s Agent`,
-      status: 'active',
+      storage.createAgent({
+        userId: created.id,
+        name: `${created.name}'s Agent`,
+        status: 'active',
+      });
+      return created;
     });
 
     p.outro(chalk.green(`Added ${user.name}!`));
@@ -587,7 +618,7 @@ program
   .alias('team')
   .description('List team members')
   .action(() => {
-    const storage = new Storage(DB_PATH);
+    const storage = getStorage();
     const users = storage.getAllUsers();
     
     console.log(chalk.cyan('\n👥 Team\n'));
@@ -705,9 +736,7 @@ program
       return;
     }
 
-    if (existsSync(CONFIG_DIR)) {
-      rmSync(CONFIG_DIR, { recursive: true });
-    }
+    resetConfigDir();
     
     console.log(chalk.green('\n✅ Reset complete. Run `agentcomm` to start fresh.\n'));
   });
@@ -848,7 +877,7 @@ orgCommand
       return;
     }
 
-    const storage = new Storage(DB_PATH);
+    const storage = getStorage();
     const members = storage.getAllUsers();
 
     console.log(chalk.cyan('\n🏢 Organization\n'));
@@ -939,13 +968,16 @@ program
     await sleep(500);
 
     ensureConfigDir();
-    const storage = new Storage(DB_PATH);
-
-    const user = storage.createUser({ name: String(userName) });
-    storage.createAgent({
-      userId: user.id,
-      name: `${user.name}'s Agent`,
-      status: 'active',
+    const storage = getStorage();
+
+    const user = storage.transaction(() => {
+      const created = storage.createUser({ name: String(userName) });
+      storage.createAgent({
+        userId: created.id,
+        name: `${created.name}'s Agent`,
+        status: 'active',
+      });
+      return created;
     });
 
     const config: CLIConfig = {
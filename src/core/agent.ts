@@ -9,11 +9,12 @@
  * 5. Manages the user's task queue
  */
 
-import { LLMClient, SYSTEM_PROMPTS } from './llm.js';
+import { LLMClient, SYSTEM_PROMPTS, getLLMClient } from './llm.js';
 import { Storage } from '../storage/database.js';
+import { LRUCache } from './cache.js';
 import type { 
   User, Agent as AgentRecord, Request, Task, Message, 
-  LLMConfig, OrgContext, EventHandler, Event
+  LLMConfig, LLMMessage, OrgContext, EventHandler, Event
 } from './types.js';
 
 export interface AgentConfig {
@@ -23,6 +24,35 @@ export interface AgentConfig {
   maxFollowUps?: number;
 }
 
+type Intent = {
+  type: 'request' | 'status' | 'tasks' | 'respond' | 'general';
+  requestId?: string;
+  details?: string;
+  // Counts already looked up while classifying, so handlers can skip empty queries
+  pendingTaskCount?: number;
+  activeRequestCount?: number;
+};
+
+// Leading task number in a reply, e.g. "2: done" or "1. sent it"
+const TASK_NUMBER_PATTERN = /^(\d+)[.:\s]/;
+const TASK_NUMBER_PREFIX_PATTERN = /^\d+[.:\s]+/;
+// Stricter form for skipping the classifier: an explicit "N:" or "N." (not a
+// decimal like "1.5") followed by text, since "3 people need access" is a new
+// request, not a reply
+const EXPLICIT_TASK_REPLY_PATTERN = /^(\d+)(?::|\.(?!\d))\s*\S/;
+const WHITESPACE_PATTERN = /\s+/g;
+
+// How long the rendered org context for routing prompts is reused
+const ROUTING_CONTEXT_TTL_MS = 30 * 1000;
+
+// Messages whose intent is obvious enough to skip the classifier call
+const STATUS_KEYWORDS = new Set(['status', 'my requests', 'my status']);
+const TASKS_KEYWORDS = new Set(['tasks', 'my tasks', 'todo', 'to do', "what's pending"]);
+const TRAILING_PUNCTUATION_PATTERN = /[?!.\s]+$/;
+
+// Upper bound on remembered intent classifications per agent
+const INTENT_CACHE_SIZE = 256;
+
 interface RoutingDecision {
   targetUserId: string | null;
   targetTeam: string | null;
@@ -31,6 +61,30 @@ interface RoutingDecision {
   formattedRequest: string;
 }
 
+// Drop null, undefined and empty-array fields before serialising into a prompt
+function compactFields<T extends object>(value: T): Partial<T> {
+  return Object.fromEntries(
+    Object.entries(value).filter(([, v]) => v != null && !(Array.isArray(v) && v.length === 0))
+  ) as Partial<T>;
+}
+
+/**
+ * Parse the router's JSON reply, dropping fields of the wrong type so callers
+ * can rely on the RoutingDecision shape
+ */
+function parseRoutingDecision(content: string, message: string): RoutingDecision {
+  const raw = JSON.parse(content);
+  return {
+    targetUserId: typeof raw?.targetUserId === 'string' && raw.targetUserId ? raw.targetUserId : null,
+    targetTeam: typeof raw?.targetTeam === 'string' && raw.targetTeam ? raw.targetTeam : null,
+    confidence: typeof raw?.confidence === 'number' ? raw.confidence : 0,
+    reasoning: typeof raw?.reasoning === 'string' ? raw.reasoning : '',
+    formattedRequest: typeof raw?.formattedRequest === 'string' && raw.formattedRequest
+      ? raw.formattedRequest
+      : message,
+  };
+}
+
 export class CommunicationAgent {
   private user: User;
   private agent: AgentRecord;
@@ -39,6 +93,8 @@ export class CommunicationAgent {
   private orgContext: OrgContext;
   private eventHandlers: Map<string, EventHandler[]> = new Map();
   private config: AgentConfig;
+  private intentCache = new LRUCache<string, Intent>(INTENT_CACHE_SIZE);
+  private routingContext?: { text: string; expiresAt: number };
 
   constructor(
     user: User,
@@ -50,7 +106,7 @@ export class CommunicationAgent {
     this.user = user;
     this.agent = agent;
     this.config = config;
-    this.llm = new LLMClient(config.llmConfig);
+    this.llm = getLLMClient(config.llmConfig);
     this.storage = storage;
     this.orgContext = orgContext;
   }
@@ -61,14 +117,36 @@ export class CommunicationAgent {
   async handleUserMessage(message: string): Promise<string> {
     // First, understand the intent
     const intent = await this.classifyIntent(message);
+    return this.handleIntent(message, intent);
+  }
+
+  /**
+   * Like handleUserMessage, but general queries are yielded as the model
+   * streams them; other intents yield their full reply once
+   */
+  async *streamUserMessage(message: string): AsyncGenerator<string> {
+    const intent = await this.classifyIntent(message);
 
+    switch (intent.type) {
+      case 'request':
+      case 'status':
+      case 'tasks':
+      case 'respond':
+        yield await this.handleIntent(message, intent);
+        return;
+      default:
+        yield* this.llm.chatStream(this.generalQueryMessages(message), SYSTEM_PROMPTS.responder);
+    }
+  }
+
+  private async handleIntent(message: string, intent: Intent): Promise<string> {
     switch (intent.type) {
       case 'request':
         return this.handleNewRequest(message, intent);
       case 'status':
-        return this.handleStatusQuery(message);
+        return this.handleStatusQuery(message, intent);
       case 'tasks':
-        return this.handleTasksQuery();
+        return this.handleTasksQuery(intent);
       case 'respond':
         return this.handleResponseToRequest(message, intent);
       case 'general':
@@ -81,13 +159,21 @@ export class CommunicationAgent {
   /**
    * Classify what the user is trying to do
    */
-  private async classifyIntent(message: string): Promise<{
-    type: 'request' | 'status' | 'tasks' | 'respond' | 'general';
-    requestId?: string;
-    details?: string;
-  }> {
-    const pendingTasks = this.storage.getTasksForUser(this.user.id, 'pending');
-    const outgoingRequests = this.storage.getRequestsByFromUser(this.user.id);
+  private async classifyIntent(message: string): Promise<Intent> {
+    const fast = this.fastClassify(message);
+    if (fast) return fast;
+
+    // Only the counts go into the prompt, so don't load the rows
+    const pendingTaskCount = this.storage.countTasksForUser(this.user.id, 'pending');
+    if (this.isNumberedReply(message, pendingTaskCount)) {
+      return { type: 'respond', pendingTaskCount };
+    }
+    const activeRequestCount = this.storage.countActiveRequestsByFromUser(this.user.id);
+
+    // Repeats like "tasks" or "status" with unchanged counts get the same answer
+    const cacheKey = `${pendingTaskCount}:${activeRequestCount}:${message.trim().toLowerCase().replace(WHITESPACE_PATTERN, ' ')}`;
+    const cached = this.intentCache.get(cacheKey);
+    if (cached) return cached;
     
     const response = await this.llm.chat([
       {
@@ -96,8 +182,8 @@ export class CommunicationAgent {
 "${message}"
 
 Context:
-- User has ${pendingTasks.length} pending tasks
-- User has ${outgoingRequests.filter(r => r.status !== 'completed').length} active outgoing requests
+- User has ${pendingTaskCount} pending tasks
+- User has ${activeRequestCount} active outgoing requests
 
 Respond with JSON only:
 {
@@ -112,15 +198,40 @@ Respond with JSON only:
 - "respond": User responding to a task/request in their queue
 - "general": General question or chat`
       }
-    ]);
+    ], undefined, { jsonMode: true });
 
     try {
-      return JSON.parse(response.content);
+      const intent: Intent = { ...JSON.parse(response.content), pendingTaskCount, activeRequestCount };
+      this.intentCache.set(cacheKey, intent);
+      return intent;
     } catch {
       return { type: 'general' };
     }
   }
 
+  /**
+   * Structurally obvious intents: a bare status/tasks keyword
+   */
+  private fastClassify(message: string): Intent | null {
+    const normalized = message.trim().toLowerCase().replace(TRAILING_PUNCTUATION_PATTERN, '');
+    if (STATUS_KEYWORDS.has(normalized)) return { type: 'status' };
+    if (TASKS_KEYWORDS.has(normalized)) return { type: 'tasks' };
+    return null;
+  }
+
+  /**
+   * A reply like "2: done" that names one of the pending tasks and says
+   * something. Anything else starting with a number ("3 people need access",
+   * "10 minutes until standup...") is left to the classifier.
+   */
+  private isNumberedReply(message: string, pendingTaskCount: number): boolean {
+    const numMatch = message.match(EXPLICIT_TASK_REPLY_PATTERN);
+    if (!numMatch) return false;
+
+    const taskNumber = parseInt(numMatch[1]);
+    return taskNumber >= 1 && taskNumber <= pendingTaskCount;
+  }
+
   /**
    * Handle a new request - route it to the right person
    */
@@ -151,26 +262,30 @@ Respond with JSON only:
       return `I found that ${routing.targetTeam || 'the right team'} should handle this, but I couldn't find a specific person. Could you help me identify who to ask?`;
     }
 
-    // Create the request
-    const request = this.storage.createRequest({
-      fromUserId: this.user.id,
-      fromAgentId: this.agent.id,
-      toUserId: targetUser.id,
-      toAgentId: this.storage.getAgentByUserId(targetUser.id)?.id,
-      subject: this.extractSubject(message),
-      description: routing.formattedRequest,
-      status: 'pending',
-      priority: 'normal',
-    });
-
-    // Create a task for the target user
-    this.storage.createTask({
-      userId: targetUser.id,
-      requestId: request.id,
-      title: `Request from ${this.user.name}`,
-      description: routing.formattedRequest,
-      status: 'pending',
-      priority: 'normal',
+    // Create the request and the target's task together, so neither exists without the other
+    const recipient = targetUser;
+    const request = this.storage.transaction(() => {
+      const created = this.storage.createRequest({
+        fromUserId: this.user.id,
+        fromAgentId: this.agent.id,
+        toUserId: recipient.id,
+        toAgentId: this.storage.getAgentIdByUserId(recipient.id),
+        subject: this.extractSubject(message),
+        description: routing.formattedRequest,
+        status: 'pending',
+        priority: 'normal',
+      });
+
+      this.storage.createTask({
+        userId: recipient.id,
+        requestId: created.id,
+        title: `Request from ${this.user.name}`,
+        description: routing.formattedRequest,
+        status: 'pending',
+        priority: 'normal',
+      });
+
+      return created;
     });
 
     // Emit event
@@ -179,17 +294,42 @@ Respond with JSON only:
     return `Got it! I've sent your request to ${targetUser.name}.\n\n**Request:** ${routing.formattedRequest}\n\nI'll follow up if they don't respond and let you know when I have an answer.`;
   }
 
+  /**
+   * Org context for the routing prompt, rebuilt at most every ROUTING_CONTEXT_TTL_MS
+   */
+  private getRoutingContext(): string {
+    const now = Date.now();
+    if (this.routingContext && this.routingContext.expiresAt > now) {
+      return this.routingContext.text;
+    }
+
+    // Only the fields the router needs, with unset ones and empty sections left out
+    const { teams, routingRules } = this.orgContext;
+    const users = this.storage.getAllUsers();
+    const sections: string[] = [];
+    if (teams.length > 0) {
+      sections.push(`Teams: ${JSON.stringify(teams.map(t => compactFields({
+        name: t.name, description: t.description, members: t.members, expertise: t.expertise,
+      })))}`);
+    }
+    sections.push(`Users: ${JSON.stringify(users.map(u => compactFields({
+      id: u.id, name: u.name, role: u.role, team: u.team, expertise: u.expertise,
+    })))}`);
+    if (routingRules.length > 0) {
+      sections.push(`Routing Rules: ${JSON.stringify(routingRules.map(r => compactFields({
+        pattern: r.pattern, targetTeam: r.targetTeam, targetUser: r.targetUser, priority: r.priority,
+      })))}`);
+    }
+    const text = sections.join('\n');
+    this.routingContext = { text, expiresAt: now + ROUTING_CONTEXT_TTL_MS };
+    return text;
+  }
+
   /**
    * Route a request to the right person/team
    */
   private async routeRequest(message: string): Promise<RoutingDecision> {
-    const users = this.storage.getAllUsers();
-    
-    const orgContextStr = `
-Teams: ${JSON.stringify(this.orgContext.teams)}
-Users: ${JSON.stringify(users.map(u => ({ id: u.id, name: u.name, role: u.role, team: u.team, expertise: u.expertise })))}
-Routing Rules: ${JSON.stringify(this.orgContext.routingRules)}
-    `;
+    const orgContextStr = this.getRoutingContext();
 
     const response = await this.llm.chat([
       {
@@ -210,10 +350,10 @@ Respond with JSON:
   "formattedRequest": "clear, actionable version of the request"
 }`
       }
-    ], SYSTEM_PROMPTS.router);
+    ], SYSTEM_PROMPTS.router, { jsonMode: true });
 
     try {
-      return JSON.parse(response.content);
+      return parseRoutingDecision(response.content, message);
     } catch {
       return {
         targetUserId: null,
@@ -228,16 +368,22 @@ Respond with JSON:
   /**
    * Handle status query - show user their outgoing requests
    */
-  private async handleStatusQuery(message: string): Promise<string> {
-    const requests = this.storage.getRequestsByFromUser(this.user.id);
-    const active = requests.filter(r => r.status !== 'completed' && r.status !== 'cancelled');
+  private async handleStatusQuery(message: string, intent: Intent): Promise<string> {
+    const active = intent.activeRequestCount === 0
+      ? []
+      : this.storage.getActiveRequestsByFromUser(this.user.id);
     
     if (active.length === 0) {
       return "You don't have any active requests at the moment.";
     }
 
+    // Resolve all target users in one query instead of one lookup per request
+    const targets = this.storage.getUsersByIds(
+      active.flatMap(r => (r.toUserId ? [r.toUserId] : []))
+    );
+
     const statusLines = active.map(r => {
-      const target = r.toUserId ? this.storage.getUser(r.toUserId)?.name : 'Unknown';
+      const target = r.toUserId ? targets.get(r.toUserId)?.name : 'Unknown';
       return `• **${r.subject}** → ${target} (${r.status})`;
     });
 
@@ -247,16 +393,20 @@ Respond with JSON:
   /**
    * Handle tasks query - show user what others need from them
    */
-  private async handleTasksQuery(): Promise<string> {
-    const tasks = this.storage.getTasksForUser(this.user.id, 'pending');
+  private async handleTasksQuery(intent: Intent): Promise<string> {
+    const tasks = intent.pendingTaskCount === 0
+      ? []
+      : this.storage.getTasksForUser(this.user.id, 'pending');
     
     if (tasks.length === 0) {
       return "🎉 No pending tasks! You're all caught up.";
     }
 
+    // One joined query for every requester name, rather than one lookup per task
+    const requesters = this.storage.getRequesterNamesByRequestIds(tasks.map(t => t.requestId));
+
     const taskLines = tasks.map((t, i) => {
-      const request = this.storage.getRequest(t.requestId);
-      const from = request?.fromUserId ? this.storage.getUser(request.fromUserId)?.name : 'Unknown';
+      const from = requesters.get(t.requestId) ?? 'Unknown';
       return `${i + 1}. **${t.title}** (from ${from})\n   ${t.description}`;
     });
 
@@ -268,17 +418,19 @@ Respond with JSON:
    */
   private async handleResponseToRequest(
     message: string,
-    intent: { requestId?: string }
+    intent: Intent
   ): Promise<string> {
     // Try to find which task/request they're responding to
-    const tasks = this.storage.getTasksForUser(this.user.id, 'pending');
+    const tasks = intent.pendingTaskCount === 0
+      ? []
+      : this.storage.getTasksForUser(this.user.id, 'pending');
     
     if (tasks.length === 0) {
       return "You don't have any pending tasks to respond to.";
     }
 
     // Check if they specified a number
-    const numMatch = message.match(/^(\d+)[.:\s]/);
+    const numMatch = message.match(TASK_NUMBER_PATTERN);
     let targetTask = tasks[0];
     
     if (numMatch) {
@@ -295,17 +447,10 @@ Respond with JSON:
     }
 
     // Clean up the response (remove number prefix if present)
-    const cleanResponse = message.replace(/^\d+[.:\s]+/, '').trim();
-
-    // Update request with response
-    this.storage.updateRequest(request.id, {
-      status: 'completed',
-      response: cleanResponse,
-      completedAt: new Date(),
-    });
+    const cleanResponse = message.replace(TASK_NUMBER_PREFIX_PATTERN, '').trim();
 
-    // Mark task as completed
-    this.storage.updateTask(targetTask.id, { status: 'completed' });
+    // Store the response and mark both the request and the task completed
+    this.storage.completeRequest(request.id, targetTask.id, cleanResponse);
 
     // Emit event
     this.emit({ type: 'request.completed', payload: { request, response: cleanResponse }, timestamp: new Date() });
@@ -318,6 +463,11 @@ Respond with JSON:
    * Handle general queries
    */
   private async handleGeneralQuery(message: string): Promise<string> {
+    const response = await this.llm.chat(this.generalQueryMessages(message), SYSTEM_PROMPTS.responder);
+    return response.content;
+  }
+
+  private generalQueryMessages(message: string): LLMMessage[] {
     // Check memory first
     const memories = this.storage.searchMemories(message, 5);
     
@@ -325,14 +475,12 @@ Respond with JSON:
       ? `\n\nRelevant context from team knowledge:\n${memories.map(m => `- ${m.content}`).join('\n')}`
       : '';
 
-    const response = await this.llm.chat([
+    return [
       {
         role: 'user',
         content: `${message}${memoryContext}`
       }
-    ], SYSTEM_PROMPTS.responder);
-
-    return response.content;
+    ];
   }
 
   /**
@@ -357,15 +505,13 @@ Respond with JSON:
    * Process follow-ups for stale requests
    */
   async processFollowUps(): Promise<void> {
-    const requests = this.storage.getRequestsByFromUser(this.user.id);
-    const staleRequests = requests.filter(r => {
-      if (r.status === 'completed' || r.status === 'cancelled') return false;
-      if (r.followUpCount >= (this.config.maxFollowUps || 3)) return false;
-      
-      const lastActivity = r.lastFollowUp || r.createdAt;
-      const hoursSinceActivity = (Date.now() - lastActivity.getTime()) / (1000 * 60 * 60);
-      return hoursSinceActivity >= 24; // Follow up after 24 hours
-    });
+    // Follow up after 24 hours without activity; let SQLite do the filtering
+    const cutoff = new Date(Date.now() - 24 * 60 * 60 * 1000);
+    const staleRequests = this.storage.getStaleRequestsByFromUser(
+      this.user.id,
+      this.config.maxFollowUps || 3,
+      cutoff
+    );
 
     for (const request of staleRequests) {
       await this.sendFollowUp(request);
@@ -409,8 +555,8 @@ Previous follow-ups: ${request.followUpCount}`
 
   private extractSubject(message: string): string {
     // Extract a short subject from the message
-    const words = message.split(' ').slice(0, 8);
-    return words.join(' ') + (message.split(' ').length > 8 ? '...' : '');
+    const words = message.split(' ');
+    return words.length > 8 ? words.slice(0, 8).join(' ') + '...' : message;
   }
 
   // Event handling
@@ -423,11 +569,19 @@ Previous follow-ups: ${request.followUpCount}`
 
   private emit(event: Event): void {
     const handlers = this.eventHandlers.get(event.type) || [];
-    handlers.forEach(h => h(event));
+    handlers.forEach(h => this.runHandler(h, event));
     
     // Also emit to wildcard handlers
     const wildcardHandlers = this.eventHandlers.get('*') || [];
-    wildcardHandlers.forEach(h => h(event));
+    wildcardHandlers.forEach(h => this.runHandler(h, event));
+  }
+
+  private runHandler(handler: EventHandler, event: Event): void {
+    // Handlers run in the background (e.g. Slack notifications), so log
+    // failures rather than leaving them as unhandled rejections
+    Promise.resolve(handler(event)).catch(error => {
+      console.error(`Error in ${event.type} handler:`, error);
+    });
   }
 
   // Getters
@@ -0,0 +1,36 @@
+/**
+ * Small in-process cache shared by the agent and storage layers
+ */
+
+/**
+ * Map with a size cap that evicts the least recently used entry.
+ * A hit moves the entry to the back of the Map's insertion order, so the
+ * first key is always the one that has gone longest without use.
+ */
+export class LRUCache<K, V> {
+  private entries = new Map<K, V>();
+  private maxSize: number;
+
+  constructor(maxSize: number) {
+    this.maxSize = maxSize;
+  }
+
+  get(key: K): V | undefined {
+    const value = this.entries.get(key);
+    if (value !== undefined) {
+      this.entries.delete(key);
+      this.entries.set(key, value);
+    }
+    return value;
+  }
+
+  set(key: K, value: V): V {
+    this.entries.delete(key);
+    if (this.entries.size >= this.maxSize) {
+      const oldest = this.entries.keys().next().value;
+      if (oldest !== undefined) this.entries.delete(oldest);
+    }
+    this.entries.set(key, value);
+    return value;
+  }
+}
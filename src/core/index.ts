@@ -5,3 +5,4 @@
 export * from './types.js';
 export * from './llm.js';
 export * from './agent.js';
+export * from './text.js';
@@ -2,48 +2,84 @@
  * LLM Integration - Unified interface for OpenAI/Anthropic
  */
 
-import Anthropic from '@anthropic-ai/sdk';
-import OpenAI from 'openai';
-import type { LLMConfig, LLMMessage, LLMResponse } from './types.js';
+import type Anthropic from '@anthropic-ai/sdk';
+import type OpenAI from 'openai';
+import type { ChatOptions, LLMConfig, LLMMessage, LLMResponse } from './types.js';
+
+type ChatFn = (messages: LLMMessage[], systemPrompt?: string, options?: ChatOptions) => Promise<LLMResponse>;
+type StreamFn = (messages: LLMMessage[], systemPrompt?: string) => AsyncGenerator<string>;
 
 export class LLMClient {
   private config: LLMConfig;
-  private anthropic?: Anthropic;
-  private openai?: OpenAI;
+  private anthropic?: Promise<Anthropic>;
+  private openai?: Promise<OpenAI>;
+  // The provider never changes for a client, so pick its implementation once
+  private chatImpl: ChatFn;
+  private streamImpl: StreamFn;
 
   constructor(config: LLMConfig) {
     this.config = config;
     
     if (config.provider === 'anthropic') {
-      this.anthropic = new Anthropic({ apiKey: config.apiKey });
+      this.chatImpl = this.chatAnthropic.bind(this);
+      this.streamImpl = this.streamAnthropic.bind(this);
     } else if (config.provider === 'openai') {
-      this.openai = new OpenAI({ 
-        apiKey: config.apiKey,
-        baseURL: config.baseUrl 
-      });
+      this.chatImpl = this.chatOpenAI.bind(this);
+      this.streamImpl = this.streamOpenAI.bind(this);
+    } else {
+      this.chatImpl = this.unsupported.bind(this);
+      this.streamImpl = this.unsupportedStream.bind(this);
     }
   }
 
-  async chat(messages: LLMMessage[], systemPrompt?: string): Promise<LLMResponse> {
-    if (this.config.provider === 'anthropic') {
-      return this.chatAnthropic(messages, systemPrompt);
-    } else if (this.config.provider === 'openai') {
-      return this.chatOpenAI(messages, systemPrompt);
-    }
+  chat(messages: LLMMessage[], systemPrompt?: string, options: ChatOptions = {}): Promise<LLMResponse> {
+    return this.chatImpl(messages, systemPrompt, options);
+  }
+
+  /**
+   * Stream the reply as text deltas, for callers that show it as it arrives
+   */
+  chatStream(messages: LLMMessage[], systemPrompt?: string): AsyncGenerator<string> {
+    return this.streamImpl(messages, systemPrompt);
+  }
+
+  // SDKs are imported on first use, so a process only loads the provider it talks to
+  private getAnthropic(): Promise<Anthropic> {
+    this.anthropic ??= import('@anthropic-ai/sdk').then(
+      ({ default: AnthropicSDK }) => new AnthropicSDK({ apiKey: this.config.apiKey })
+    );
+    return this.anthropic;
+  }
+
+  private getOpenAI(): Promise<OpenAI> {
+    this.openai ??= import('openai').then(
+      ({ default: OpenAISDK }) => new OpenAISDK({
+        apiKey: this.config.apiKey,
+        baseURL: this.config.baseUrl,
+      })
+    );
+    return this.openai;
+  }
+
+  private async unsupported(): Promise<LLMResponse> {
     throw new Error(`Unsupported provider: ${this.config.provider}`);
   }
 
-  private async chatAnthropic(messages: LLMMessage[], systemPrompt?: string): Promise<LLMResponse> {
-    if (!this.anthropic) throw new Error('Anthropic client not initialized');
+  private async *unsupportedStream(): AsyncGenerator<string> {
+    throw new Error(`Unsupported provider: ${this.config.provider}`);
+  }
 
-    const anthropicMessages = messages
-      .filter(m => m.role !== 'system')
-      .map(m => ({
-        role: m.role as 'user' | 'assistant',
-        content: m.content,
-      }));
+  private async chatAnthropic(messages: LLMMessage[], systemPrompt?: string, options: ChatOptions = {}): Promise<LLMResponse> {
+    const anthropic = await this.getAnthropic();
 
-    const response = await this.anthropic.messages.create({
+    const anthropicMessages = this.toAnthropicMessages(messages);
+
+    // Prefilling the reply with "{" keeps the model from wrapping the JSON in prose
+    if (options.jsonMode) {
+      anthropicMessages.push({ role: 'assistant', content: '{' });
+    }
+
+    const response = await anthropic.messages.create({
       model: this.config.model,
       max_tokens: 4096,
       system: systemPrompt || messages.find(m => m.role === 'system')?.content,
@@ -52,8 +88,10 @@ export class LLMClient {
 
     const textContent = response.content.find(c => c.type === 'text');
     
+    const text = textContent?.text || '';
+
     return {
-      content: textContent?.text || '',
+      content: options.jsonMode ? `{${text}` : text,
       usage: {
         inputTokens: response.usage.input_tokens,
         outputTokens: response.usage.output_tokens,
@@ -61,19 +99,17 @@ export class LLMClient {
     };
   }
 
-  private async chatOpenAI(messages: LLMMessage[], systemPrompt?: string): Promise<LLMResponse> {
-    if (!this.openai) throw new Error('OpenAI client not initialized');
+  private async chatOpenAI(messages: LLMMessage[], systemPrompt?: string, options: ChatOptions = {}): Promise<LLMResponse> {
+    const openai = await this.getOpenAI();
 
-    const openaiMessages = systemPrompt 
-      ? [{ role: 'system' as const, content: systemPrompt }, ...messages]
-      : messages;
+    // OpenAI-compatible servers behind a custom baseUrl may reject
+    // response_format, so they rely on the prompt asking for JSON only
+    const jsonMode = options.jsonMode && !this.config.baseUrl;
 
-    const response = await this.openai.chat.completions.create({
+    const response = await openai.chat.completions.create({
       model: this.config.model,
-      messages: openaiMessages.map(m => ({
-        role: m.role,
-        content: m.content,
-      })),
+      messages: this.toOpenAIMessages(messages, systemPrompt),
+      ...(jsonMode ? { response_format: { type: 'json_object' as const } } : {}),
     });
 
     return {
@@ -84,6 +120,73 @@ export class LLMClient {
       } : undefined,
     };
   }
+
+  private async *streamAnthropic(messages: LLMMessage[], systemPrompt?: string): AsyncGenerator<string> {
+    const anthropic = await this.getAnthropic();
+
+    const stream = await anthropic.messages.create({
+      model: this.config.model,
+      max_tokens: 4096,
+      system: systemPrompt || messages.find(m => m.role === 'system')?.content,
+      messages: this.toAnthropicMessages(messages),
+      stream: true,
+    });
+
+    for await (const event of stream) {
+      if (event.type === 'content_block_delta' && event.delta.type === 'text_delta') {
+        yield event.delta.text;
+      }
+    }
+  }
+
+  private async *streamOpenAI(messages: LLMMessage[], systemPrompt?: string): AsyncGenerator<string> {
+    const openai = await this.getOpenAI();
+
+    const stream = await openai.chat.completions.create({
+      model: this.config.model,
+      messages: this.toOpenAIMessages(messages, systemPrompt),
+      stream: true,
+    });
+
+    for await (const chunk of stream) {
+      const delta = chunk.choices[0]?.delta?.content;
+      if (delta) yield delta;
+    }
+  }
+
+  private toAnthropicMessages(messages: LLMMessage[]) {
+    return messages
+      .filter(m => m.role !== 'system')
+      .map(m => ({
+        role: m.role as 'user' | 'assistant',
+        content: m.content,
+      }));
+  }
+
+  private toOpenAIMessages(messages: LLMMessage[], systemPrompt?: string) {
+    const openaiMessages = systemPrompt 
+      ? [{ role: 'system' as const, content: systemPrompt }, ...messages]
+      : messages;
+
+    return openaiMessages.map(m => ({
+      role: m.role,
+      content: m.content,
+    }));
+  }
+}
+
+// Agents are created per Slack user and per dashboard connection; reuse one
+// client (and its HTTP connection pool) for each distinct LLM config
+const sharedClients = new Map<string, LLMClient>();
+
+export function getLLMClient(config: LLMConfig): LLMClient {
+  const key = [config.provider, config.model, config.apiKey, config.baseUrl ?? ''].join('\0');
+  let client = sharedClients.get(key);
+  if (!client) {
+    client = new LLMClient(config);
+    sharedClients.set(key, client);
+  }
+  return client;
 }
 
 // System prompts for different agent tasks
@@ -0,0 +1,23 @@
+/**
+ * Text helpers shared by the agent and integrations
+ */
+
+// Created once; segmenters are comparatively expensive to construct
+const graphemes = new Intl.Segmenter(undefined, { granularity: 'grapheme' });
+
+/**
+ * Shorten text to at most `maxLength` UTF-16 units, appending an ellipsis when cut.
+ * Cuts only between grapheme clusters, so flags, skin-tone and ZWJ emoji and
+ * combining marks at the boundary are dropped whole rather than split.
+ */
+export function truncate(text: string, maxLength: number, ellipsis: string = '...'): string {
+  if (text.length <= maxLength) return text;
+
+  let end = 0;
+  for (const { index, segment } of graphemes.segment(text)) {
+    if (index + segment.length > maxLength) break;
+    end = index + segment.length;
+  }
+
+  return text.slice(0, end) + ellipsis;
+}
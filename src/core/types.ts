@@ -126,6 +126,11 @@ export interface LLMMessage {
   content: string;
 }
 
+export interface ChatOptions {
+  // Ask the provider for a single JSON object instead of free text
+  jsonMode?: boolean;
+}
+
 export interface LLMResponse {
   content: string;
   usage?: {
@@ -13,8 +13,9 @@
  */
 
 import { App, LogLevel } from '@slack/bolt';
-import { Storage } from '../storage/database.js';
+import { getSharedStorage, type Storage } from '../storage/database.js';
 import { CommunicationAgent, type AgentConfig } from '../core/agent.js';
+import { truncate } from '../core/text.js';
 import type { User, OrgContext, LLMConfig } from '../core/types.js';
 import dotenv from 'dotenv';
 
@@ -23,6 +24,14 @@ dotenv.config();
 // Store active agents per user
 const userAgents = new Map<string, CommunicationAgent>();
 
+// How long a resolved Slack display name is reused before asking Slack again
+const USER_NAME_TTL_MS = 10 * 60 * 1000;
+
+// Slack user mentions, e.g. <@U012ABCDEF>
+const MENTION_PATTERN = /<@([A-Z0-9]+)>/g;
+// "from [name]" / "ask [name]" phrasing in a DM
+const NAMED_TARGET_PATTERN = /(?:from|ask|need.*from|get.*from)\s+(\w+)/i;
+
 export interface SlackConfig {
   token: string;
   signingSecret: string;
@@ -32,7 +41,7 @@ export interface SlackConfig {
 }
 
 export async function startSlackApp(config: SlackConfig): Promise<App> {
-  const storage = new Storage(config.dbPath);
+  const storage = getSharedStorage(config.dbPath);
   
   // Initialize org context
   const orgContext: OrgContext = {
@@ -55,21 +64,21 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
       return userAgents.get(slackUserId)!;
     }
 
-    let user = storage.getUserBySlackId(slackUserId);
-    if (!user) {
-      user = storage.createUser({
-        name: slackUserName,
-        slackId: slackUserId,
-      });
-    }
-
-    let agentRecord = storage.getAgentByUserId(user.id);
-    if (!agentRecord) {
-      agentRecord = storage.createAgent({
-        userId: user.id,
-        name: `${user.name}'s Agent`,
-        status: 'active',
-      });
+    const existing = storage.getUserWithAgentBySlackId(slackUserId);
+    let user = existing?.user;
+    let agentRecord = existing?.agent ?? null;
+
+    if (!user || !agentRecord) {
+      // First contact: create the user (if needed) and its agent in one transaction
+      ({ user, agentRecord } = storage.transaction(() => {
+        const u = user ?? storage.getOrCreateUserBySlackId(slackUserId, slackUserName);
+        const a = storage.createAgent({
+          userId: u.id,
+          name: `${u.name}'s Agent`,
+          status: 'active',
+        });
+        return { user: u, agentRecord: a };
+      }));
     }
 
     await loadOrgContext(app, orgContext, storage);
@@ -108,10 +117,41 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
     return agent;
   }
 
+  // Display names are needed on every DM, command and home tab open; cache
+  // them for a while instead of calling users.info each time
+  const userNames = new Map<string, { name: string; expiresAt: number }>();
+
+  async function getSlackUserName(slackUserId: string): Promise<string> {
+    const cached = userNames.get(slackUserId);
+    if (cached && cached.expiresAt > Date.now()) return cached.name;
+
+    const userInfo = await app.client.users.info({ user: slackUserId });
+    const name = userInfo.user?.real_name || userInfo.user?.name || 'Unknown';
+    userNames.set(slackUserId, { name, expiresAt: Date.now() + USER_NAME_TTL_MS });
+    return name;
+  }
+
+  // Channel names rarely change, so cache them instead of calling
+  // conversations.info for every message that mentions someone
+  const channelNames = new Map<string, string>();
+
+  async function getChannelName(channelId: string): Promise<string> {
+    const cached = channelNames.get(channelId);
+    if (cached) return cached;
+
+    try {
+      const channelInfo = await app.client.conversations.info({ channel: channelId });
+      const channelName = `#${channelInfo.channel?.name || 'channel'}`;
+      channelNames.set(channelId, channelName);
+      return channelName;
+    } catch {
+      return 'a channel';
+    }
+  }
+
   // Helper to extract mentioned users from message
   function extractMentionedUsers(text: string): string[] {
-    const mentions = text.match(/<@([A-Z0-9]+)>/g) || [];
-    return mentions.map(m => m.replace(/<@|>/g, ''));
+    return Array.from(text.matchAll(MENTION_PATTERN), m => m[1]);
   }
 
   // Helper to check if message is a request for someone else
@@ -132,7 +172,7 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
       const targetUser = storage.getUserBySlackId(targetSlackId);
       
       // Clean up the message (remove the mention)
-      const cleanedRequest = text.replace(/<@[A-Z0-9]+>/g, '').trim();
+      const cleanedRequest = text.replace(MENTION_PATTERN, '').trim();
       
       return {
         isRequestForOther: true,
@@ -143,15 +183,10 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
     }
 
     // Check for "from [name]" or "ask [name]" patterns
-    const fromPattern = /(?:from|ask|need.*from|get.*from)\s+(\w+)/i;
-    const match = text.match(fromPattern);
+    const match = text.match(NAMED_TARGET_PATTERN);
     
     if (match) {
-      const targetName = match[1];
-      const allUsers = storage.getAllUsers();
-      const targetUser = allUsers.find(u => 
-        u.name.toLowerCase().includes(targetName.toLowerCase())
-      );
+      const targetUser = storage.findUserByName(match[1]);
       
       if (targetUser && targetUser.slackId !== senderId) {
         return {
@@ -181,8 +216,7 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
 
     try {
       // Get sender info
-      const userInfo = await client.users.info({ user: senderSlackId });
-      const senderName = userInfo.user?.real_name || userInfo.user?.name || 'Unknown';
+      const senderName = await getSlackUserName(senderSlackId);
 
       // Get sender's agent
       const senderAgent = await getOrCreateAgent(senderSlackId, senderName);
@@ -200,34 +234,36 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
           return;
         }
 
-        // Create request in the system
-        const request = storage.createRequest({
-          fromUserId: sender.id,
-          fromAgentId: storage.getAgentByUserId(sender.id)?.id || '',
-          toUserId: targetUser.id,
-          toAgentId: storage.getAgentByUserId(targetUser.id)?.id,
-          subject: cleanedRequest.slice(0, 50) + (cleanedRequest.length > 50 ? '...' : ''),
-          description: cleanedRequest,
-          status: 'pending',
-          priority: 'normal',
-        });
+        // Create the request and the target's task in one transaction
+        storage.transaction(() => {
+          const request = storage.createRequest({
+            fromUserId: sender.id,
+            fromAgentId: storage.getAgentIdByUserId(sender.id) || '',
+            toUserId: targetUser.id,
+            toAgentId: storage.getAgentIdByUserId(targetUser.id),
+            subject: truncate(cleanedRequest, 50),
+            description: cleanedRequest,
+            status: 'pending',
+            priority: 'normal',
+          });
 
-        // Create task for target user
-        storage.createTask({
-          userId: targetUser.id,
-          requestId: request.id,
-          title: `Request from ${senderName}`,
-          description: cleanedRequest,
-          status: 'pending',
-          priority: 'normal',
+          storage.createTask({
+            userId: targetUser.id,
+            requestId: request.id,
+            title: `Request from ${senderName}`,
+            description: cleanedRequest,
+            status: 'pending',
+            priority: 'normal',
+          });
         });
 
-        // Notify the target user
+        // Notify the target user in the background; the sender's confirmation
+        // doesn't depend on it
         if (targetUser.slackId) {
-          await client.chat.postMessage({
+          client.chat.postMessage({
             channel: targetUser.slackId,
             text: `📥 *New request from ${senderName}:*\n\n${cleanedRequest}\n\n_Reply here to respond, or say "tasks" to see all pending._`,
-          });
+          }).catch(error => console.error('Error notifying request target:', error));
         }
 
         await say(`✅ Got it! I've sent your request to *${targetUser.name}*.\n\n> ${cleanedRequest}\n\nI'll let you know when they respond.`);
@@ -256,85 +292,107 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
     const senderSlackId = event.user;
     const channelId = (event as any).channel;
 
-    // Check for user mentions
-    const mentionedUsers = extractMentionedUsers(messageText);
-    
-    for (const mentionedSlackId of mentionedUsers) {
-      // Skip if mentioning themselves or a bot
-      if (mentionedSlackId === senderSlackId) continue;
+    // Check for user mentions (skip if mentioning themselves or an unknown user)
+    const mentionedUsers = extractMentionedUsers(messageText)
+      .filter(id => id !== senderSlackId)
+      .map(id => storage.getUserBySlackId(id))
+      .filter((u): u is User => u !== null);
+    if (mentionedUsers.length === 0) return;
 
-      const mentionedUser = storage.getUserBySlackId(mentionedSlackId);
-      if (!mentionedUser) continue;
+    // Clean the message (remove mentions)
+    const cleanedMessage = messageText.replace(MENTION_PATTERN, '').trim();
 
-      // Get sender info
-      try {
-        const senderInfo = await client.users.info({ user: senderSlackId });
-        const senderName = senderInfo.user?.real_name || senderInfo.user?.name || 'Unknown';
-        
-        let sender = storage.getUserBySlackId(senderSlackId);
-        if (!sender) {
-          sender = storage.createUser({
-            name: senderName,
-            slackId: senderSlackId,
-          });
-        }
+    // Only create tasks if there's actual content beyond the mention
+    if (cleanedMessage.length < 5) return;
 
-        // Get channel name for context
-        let channelName = 'a channel';
-        try {
-          const channelInfo = await client.conversations.info({ channel: channelId });
-          channelName = `#${channelInfo.channel?.name || 'channel'}`;
-        } catch {}
+    // Sender and channel info are the same for every mention and independent
+    // of each other, so fetch them once and concurrently
+    let senderName: string;
+    let channelName: string;
+    try {
+      [senderName, channelName] = await Promise.all([
+        getSlackUserName(senderSlackId),
+        getChannelName(channelId),
+      ]);
+    } catch (error) {
+      console.error('Error processing mention:', error);
+      return;
+    }
 
-        // Clean the message (remove mentions)
-        const cleanedMessage = messageText.replace(/<@[A-Z0-9]+>/g, '').trim();
-        
-        // Only create task if there's actual content beyond the mention
-        if (cleanedMessage.length < 5) continue;
-
-        // Create a task for the mentioned user
-        const request = storage.createRequest({
-          fromUserId: sender.id,
-          fromAgentId: storage.getAgentByUserId(sender.id)?.id || '',
-          toUserId: mentionedUser.id,
-          toAgentId: storage.getAgentByUserId(mentionedUser.id)?.id,
-          subject: `Mentioned in ${channelName}`,
-          description: cleanedMessage,
-          context: `From ${channelName}: ${messageText}`,
-          status: 'pending',
-          priority: 'normal',
-        });
+    // The sender and their agent are the same for every mention
+    let sender: User;
+    let senderAgentId: string;
+    try {
+      sender = storage.getOrCreateUserBySlackId(senderSlackId, senderName);
+      senderAgentId = storage.getAgentIdByUserId(sender.id) || '';
+    } catch (error) {
+      console.error('Error processing mention:', error);
+      return;
+    }
 
-        storage.createTask({
-          userId: mentionedUser.id,
-          requestId: request.id,
-          title: `${senderName} mentioned you in ${channelName}`,
-          description: cleanedMessage,
-          status: 'pending',
-          priority: 'normal',
-        });
+    // All of the message's requests and tasks go in one transaction, so the
+    // fan-out commits once and is never left half-written
+    try {
+      storage.transaction(() => {
+        for (const mentionedUser of mentionedUsers) {
+          const request = storage.createRequest({
+            fromUserId: sender.id,
+            fromAgentId: senderAgentId,
+            toUserId: mentionedUser.id,
+            toAgentId: storage.getAgentIdByUserId(mentionedUser.id),
+            subject: `Mentioned in ${channelName}`,
+            description: cleanedMessage,
+            context: `From ${channelName}: ${messageText}`,
+            status: 'pending',
+            priority: 'normal',
+          });
 
-        // Notify the mentioned user via DM
-        if (mentionedUser.slackId) {
-          await client.chat.postMessage({
-            channel: mentionedUser.slackId,
-            text: `👋 *${senderName}* mentioned you in ${channelName}:\n\n> ${cleanedMessage}\n\n_Reply here if you'd like me to respond for you, or handle it directly in Slack._`,
+          storage.createTask({
+            userId: mentionedUser.id,
+            requestId: request.id,
+            title: `${senderName} mentioned you in ${channelName}`,
+            description: cleanedMessage,
+            status: 'pending',
+            priority: 'normal',
           });
         }
+      });
+    } catch (error) {
+      console.error('Error processing mention:', error);
+      return;
+    }
 
-      } catch (error) {
-        console.error('Error processing mention:', error);
+    // Notify the mentioned users via DM, all at once instead of one at a time
+    const notifications = mentionedUsers
+      .filter(u => u.slackId)
+      .map(u => client.chat.postMessage({
+        channel: u.slackId!,
+        text: `👋 *${senderName}* mentioned you in ${channelName}:\n\n> ${cleanedMessage}\n\n_Reply here if you'd like me to respond for you, or handle it directly in Slack._`,
+      }));
+    const results = await Promise.allSettled(notifications);
+    for (const result of results) {
+      if (result.status === 'rejected') {
+        console.error('Error processing mention:', result.reason);
       }
     }
   });
 
+  // Drop cached display names when a profile changes
+  app.event('user_change', async ({ event }) => {
+    userNames.delete(event.user.id);
+  });
+
+  // Drop cached channel names when a channel is renamed
+  app.event('channel_rename', async ({ event }) => {
+    channelNames.delete(event.channel.id);
+  });
+
   // Slash command: /agent
   app.command('/agent', async ({ command, ack, respond }) => {
     await ack();
 
     try {
-      const userInfo = await app.client.users.info({ user: command.user_id });
-      const userName = userInfo.user?.real_name || userInfo.user?.name || 'Unknown';
+      const userName = await getSlackUserName(command.user_id);
       
       const agent = await getOrCreateAgent(command.user_id, userName);
       const response = await agent.handleUserMessage(command.text || 'What are my tasks?');
@@ -349,14 +407,15 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
   // App home
   app.event('app_home_opened', async ({ event, client }) => {
     try {
-      const userInfo = await client.users.info({ user: event.user });
-      const userName = userInfo.user?.real_name || userInfo.user?.name || 'Unknown';
+      const userName = await getSlackUserName(event.user);
       
       const agent = await getOrCreateAgent(event.user, userName);
       const user = agent.getUser();
-      const tasks = storage.getTasksForUser(user.id, 'pending');
-      const requests = storage.getRequestsByFromUser(user.id)
-        .filter(r => r.status !== 'completed' && r.status !== 'cancelled');
+      // Counts for the headers, and only the three rows each section previews
+      const taskCount = storage.countTasksForUser(user.id, 'pending');
+      const tasks = storage.getTasksForUser(user.id, 'pending', 3);
+      const requestCount = storage.countActiveRequestsByFromUser(user.id);
+      const requests = storage.getActiveRequestsByFromUser(user.id, 3);
 
       await client.views.publish({
         user_id: event.user,
@@ -374,11 +433,11 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
             { type: 'divider' },
             {
               type: 'section',
-              text: { type: 'mrkdwn', text: `*📥 Incoming Tasks:* ${tasks.length} pending\n${tasks.length > 0 ? tasks.slice(0, 3).map(t => `• ${t.title}`).join('\n') : '_None_'}` }
+              text: { type: 'mrkdwn', text: `*📥 Incoming Tasks:* ${taskCount} pending\n${tasks.length > 0 ? tasks.map(t => `• ${t.title}`).join('\n') : '_None_'}` }
             },
             {
               type: 'section', 
-              text: { type: 'mrkdwn', text: `*📤 Your Requests:* ${requests.length} active\n${requests.length > 0 ? requests.slice(0, 3).map(r => `• ${r.subject}`).join('\n') : '_None_'}` }
+              text: { type: 'mrkdwn', text: `*📤 Your Requests:* ${requestCount} active\n${requests.length > 0 ? requests.map(r => `• ${r.subject}`).join('\n') : '_None_'}` }
             },
             { type: 'divider' },
             {
@@ -406,7 +465,11 @@ export async function startSlackApp(config: SlackConfig): Promise<App> {
 // Load organizational context from Slack
 async function loadOrgContext(app: App, orgContext: OrgContext, storage: Storage): Promise<void> {
   try {
-    const channelResult = await app.client.conversations.list({ types: 'public_channel' });
+    // The two listings are independent, so wait on Slack once rather than twice
+    const [channelResult, userResult] = await Promise.all([
+      app.client.conversations.list({ types: 'public_channel' }),
+      app.client.users.list(),
+    ]);
     orgContext.channels = (channelResult.channels || []).map(c => ({
       id: c.id || '',
       name: c.name || '',
@@ -414,19 +477,25 @@ async function loadOrgContext(app: App, orgContext: OrgContext, storage: Storage
       purpose: c.purpose?.value,
     }));
 
-    const userResult = await app.client.users.list();
+    // One query for everyone we already know, rather than a lookup per member
+    const knownSlackIds = storage.getKnownSlackIds();
+    const newMembers: Omit<User, 'id' | 'createdAt'>[] = [];
     for (const member of userResult.members || []) {
       if (member.is_bot || member.deleted) continue;
       
-      const existing = storage.getUserBySlackId(member.id || '');
-      if (!existing && member.id) {
-        storage.createUser({
+      if (member.id && !knownSlackIds.has(member.id)) {
+        newMembers.push({
           name: member.real_name || member.name || 'Unknown',
           slackId: member.id,
           email: member.profile?.email,
         });
+        knownSlackIds.add(member.id);
       }
     }
+    // A fresh workspace can add hundreds of members; commit them together
+    if (newMembers.length > 0) {
+      storage.createUsers(newMembers);
+    }
   } catch (error) {
     console.error('Error loading org context:', error);
   }
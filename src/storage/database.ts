@@ -4,13 +4,38 @@
 
 import Database from 'better-sqlite3';
 import { randomUUID } from 'crypto';
+import { resolve } from 'path';
+import { LRUCache } from '../core/cache.js';
 import type { User, Agent, Request, Message, Task, Memory } from '../core/types.js';
 
+// Upper bound on cached user/agent lookups per Storage
+const ROW_CACHE_SIZE = 1024;
+
 export class Storage {
   private db: Database.Database;
+  // Users and agents are only ever inserted, never updated or deleted, so a
+  // committed row stays valid once read. Rows written or read inside an open
+  // transaction aren't cached, since it may still roll back. Misses aren't
+  // cached either, since another process may create the row later.
+  private userCache = new LRUCache<string, User>(ROW_CACHE_SIZE);
+  private slackUserCache = new LRUCache<string, User>(ROW_CACHE_SIZE);
+  private agentIdCache = new LRUCache<string, string>(ROW_CACHE_SIZE);
+  private statements = new Map<string, Database.Statement>();
 
   constructor(dbPath: string = './agentcomm.db') {
     this.db = new Database(dbPath);
+    // The CLI, Slack bot and dashboard run as separate processes against the
+    // same file; WAL lets their readers proceed while another one writes.
+    this.db.pragma('journal_mode = WAL');
+    // With WAL, NORMAL only syncs at checkpoints and is still crash-safe;
+    // a larger page cache and in-memory temp tables keep hot reads off disk
+    this.db.pragma('synchronous = NORMAL');
+    this.db.pragma('cache_size = -16000');
+    this.db.pragma('temp_store = MEMORY');
+    // SQLite's lower() only folds ASCII; match JS toLowerCase() for name lookups
+    this.db.function('js_lower', { deterministic: true }, (value: unknown) =>
+      typeof value === 'string' ? value.toLowerCase() : value
+    );
     this.init();
   }
 
@@ -95,21 +120,52 @@ export class Storage {
       );
 
       CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
-      CREATE INDEX IF NOT EXISTS idx_requests_from_user ON requests(from_user_id);
-      CREATE INDEX IF NOT EXISTS idx_requests_to_user ON requests(to_user_id);
-      CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks(user_id);
+      -- Per-user lookups all filter on status too; the composites also serve
+      -- plain user_id lookups, so the single-column indexes are dropped
+      CREATE INDEX IF NOT EXISTS idx_requests_from_user_status ON requests(from_user_id, status);
+      CREATE INDEX IF NOT EXISTS idx_requests_to_user_status ON requests(to_user_id, status);
+      CREATE INDEX IF NOT EXISTS idx_tasks_user_status ON tasks(user_id, status);
+      DROP INDEX IF EXISTS idx_requests_from_user;
+      DROP INDEX IF EXISTS idx_requests_to_user;
+      DROP INDEX IF EXISTS idx_tasks_user;
       CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
-      CREATE INDEX IF NOT EXISTS idx_messages_request ON messages(request_id);
+      CREATE INDEX IF NOT EXISTS idx_agents_user ON agents(user_id);
+      CREATE INDEX IF NOT EXISTS idx_tasks_request ON tasks(request_id);
+      -- Serves both the request_id lookup and its created_at ordering
+      CREATE INDEX IF NOT EXISTS idx_messages_request_created ON messages(request_id, created_at);
+      DROP INDEX IF EXISTS idx_messages_request;
       CREATE INDEX IF NOT EXISTS idx_memories_type ON memories(type);
     `);
   }
 
+  // Prepared once per distinct SQL text and reused, so hot queries skip
+  // SQLite's parse/plan step. Only for SQL with a bounded set of shapes.
+  private stmt(sql: string): Database.Statement {
+    let statement = this.statements.get(sql);
+    if (!statement) {
+      statement = this.db.prepare(sql);
+      this.statements.set(sql, statement);
+    }
+    return statement;
+  }
+
+  // A row seen inside an open transaction may yet be rolled back, so only
+  // remember it once it is known to be committed
+  private cacheCommitted<V>(cache: LRUCache<string, V>, key: string, value: V): V {
+    return this.db.inTransaction ? value : cache.set(key, value);
+  }
+
+  // Run fn in one SQLite transaction; it commits on return and rolls back if fn throws
+  transaction<T>(fn: () => T): T {
+    return this.db.transaction(fn)();
+  }
+
   // User operations
   createUser(user: Omit<User, 'id' | 'createdAt'>): User {
     const id = randomUUID();
     const createdAt = new Date();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO users (id, name, email, slack_id, role, team, expertise, created_at)
       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     `).run(
@@ -122,18 +178,97 @@ export class Storage {
     return { ...user, id, createdAt };
   }
 
+  // Insert many users with one prepared statement inside a single transaction.
+  // Slack ids that already exist (say, added by another process) are skipped
+  // rather than failing the batch; only the rows actually inserted are returned.
+  createUsers(users: Omit<User, 'id' | 'createdAt'>[]): User[] {
+    const insert = this.stmt(`
+      INSERT INTO users (id, name, email, slack_id, role, team, expertise, created_at)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+      ON CONFLICT(slack_id) DO NOTHING
+    `);
+
+    // Rows in one batch are created together, so they share one timestamp
+    const createdAt = new Date();
+    const createdAtIso = createdAt.toISOString();
+
+    return this.db.transaction(() => users.flatMap(user => {
+      const id = randomUUID();
+      const { changes } = insert.run(
+        id, user.name, user.email || null, user.slackId || null,
+        user.role || null, user.team || null,
+        user.expertise ? JSON.stringify(user.expertise) : null,
+        createdAtIso
+      );
+      return changes > 0 ? [{ ...user, id, createdAt }] : [];
+    }))();
+  }
+
   getUser(id: string): User | null {
-    const row = this.db.prepare('SELECT * FROM users WHERE id = ?').get(id) as Record<string, unknown> | undefined;
-    return row ? this.rowToUser(row) : null;
+    const cached = this.userCache.get(id);
+    if (cached) return cached;
+
+    const row = this.stmt('SELECT * FROM users WHERE id = ?').get(id) as Record<string, unknown> | undefined;
+    return row ? this.cacheCommitted(this.userCache, id, this.rowToUser(row)) : null;
   }
 
   getUserBySlackId(slackId: string): User | null {
-    const row = this.db.prepare('SELECT * FROM users WHERE slack_id = ?').get(slackId) as Record<string, unknown> | undefined;
+    const cached = this.slackUserCache.get(slackId);
+    if (cached) return cached;
+
+    const row = this.stmt('SELECT * FROM users WHERE slack_id = ?').get(slackId) as Record<string, unknown> | undefined;
+    return row ? this.cacheCommitted(this.slackUserCache, slackId, this.rowToUser(row)) : null;
+  }
+
+  // Look up a Slack user, inserting them if missing. The insert is a single
+  // upsert, so two processes seeing the same new user can't both create it.
+  getOrCreateUserBySlackId(slackId: string, name: string): User {
+    const existing = this.getUserBySlackId(slackId);
+    if (existing) return existing;
+
+    // The no-op update makes RETURNING yield the row that won a concurrent insert
+    const row = this.stmt(`
+      INSERT INTO users (id, name, slack_id, created_at)
+      VALUES (?, ?, ?, ?)
+      ON CONFLICT(slack_id) DO UPDATE SET slack_id = excluded.slack_id
+      RETURNING *
+    `).get(randomUUID(), name, slackId, new Date().toISOString()) as Record<string, unknown>;
+    // Not cached: a caller's transaction may roll this insert back; the next
+    // getUserBySlackId outside a transaction caches the committed row
+    return this.rowToUser(row);
+  }
+
+  getKnownSlackIds(): Set<string> {
+    // Stream rows straight into the set rather than materialising an array first
+    return new Set(
+      this.stmt('SELECT slack_id FROM users WHERE slack_id IS NOT NULL').pluck().iterate() as IterableIterator<string>
+    );
+  }
+
+  findUserByName(name: string): User | null {
+    // Case-insensitive substring match, first hit wins
+    const row = this.stmt(
+      'SELECT * FROM users WHERE instr(js_lower(name), js_lower(?)) > 0 LIMIT 1'
+    ).get(name) as Record<string, unknown> | undefined;
     return row ? this.rowToUser(row) : null;
   }
 
+  getUsersByIds(ids: string[]): Map<string, User> {
+    const users = new Map<string, User>();
+    const uniqueIds = [...new Set(ids)];
+    if (uniqueIds.length === 0) return users;
+
+    const placeholders = uniqueIds.map(() => '?').join(', ');
+    const rows = this.db.prepare(`SELECT * FROM users WHERE id IN (${placeholders})`).all(...uniqueIds) as Record<string, unknown>[];
+    for (const row of rows) {
+      const user = this.rowToUser(row);
+      users.set(user.id, user);
+    }
+    return users;
+  }
+
   getAllUsers(): User[] {
-    const rows = this.db.prepare('SELECT * FROM users').all() as Record<string, unknown>[];
+    const rows = this.stmt('SELECT * FROM users').all() as Record<string, unknown>[];
     return rows.map(r => this.rowToUser(r));
   }
 
@@ -155,7 +290,7 @@ export class Storage {
     const id = randomUUID();
     const createdAt = new Date();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO agents (id, user_id, name, status, created_at)
       VALUES (?, ?, ?, ?, ?)
     `).run(id, agent.userId, agent.name, agent.status, createdAt.toISOString());
@@ -164,9 +299,52 @@ export class Storage {
   }
 
   getAgentByUserId(userId: string): Agent | null {
-    const row = this.db.prepare('SELECT * FROM agents WHERE user_id = ?').get(userId) as Record<string, unknown> | undefined;
+    const row = this.stmt('SELECT * FROM agents WHERE user_id = ?').get(userId) as Record<string, unknown> | undefined;
+    return row ? this.rowToAgent(row) : null;
+  }
+
+  // Only the id, for callers linking a request to the user's agent
+  getAgentIdByUserId(userId: string): string | undefined {
+    const cached = this.agentIdCache.get(userId);
+    if (cached) return cached;
+
+    const id = this.stmt('SELECT id FROM agents WHERE user_id = ?').pluck().get(userId) as string | undefined;
+    return id ? this.cacheCommitted(this.agentIdCache, userId, id) : undefined;
+  }
+
+  // A user and their agent in one round-trip, for the places that always need both
+  getUserWithAgent(userId: string): { user: User; agent: Agent | null } | null {
+    return this.selectUserWithAgent('u.id = ?', userId);
+  }
+
+  getUserWithAgentBySlackId(slackId: string): { user: User; agent: Agent | null } | null {
+    return this.selectUserWithAgent('u.slack_id = ?', slackId);
+  }
+
+  private selectUserWithAgent(where: string, value: string): { user: User; agent: Agent | null } | null {
+    const row = this.stmt(`
+      SELECT u.*, a.id AS agent_id, a.name AS agent_name, a.status AS agent_status, a.created_at AS agent_created_at
+      FROM users u LEFT JOIN agents a ON a.user_id = u.id
+      WHERE ${where}
+      LIMIT 1
+    `).get(value) as Record<string, unknown> | undefined;
     if (!row) return null;
-    
+
+    return {
+      user: this.rowToUser(row),
+      agent: row.agent_id
+        ? this.rowToAgent({
+            id: row.agent_id,
+            user_id: row.id,
+            name: row.agent_name,
+            status: row.agent_status,
+            created_at: row.agent_created_at,
+          })
+        : null,
+    };
+  }
+
+  private rowToAgent(row: Record<string, unknown>): Agent {
     return {
       id: row.id as string,
       userId: row.user_id as string,
@@ -180,8 +358,9 @@ export class Storage {
   createRequest(request: Omit<Request, 'id' | 'createdAt' | 'updatedAt' | 'followUpCount'>): Request {
     const id = randomUUID();
     const now = new Date();
+    const nowIso = now.toISOString();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO requests (
         id, from_user_id, from_agent_id, to_user_id, to_agent_id,
         subject, description, context, status, priority, due_date,
@@ -192,7 +371,7 @@ export class Storage {
       request.toUserId || null, request.toAgentId || null,
       request.subject, request.description, request.context || null,
       request.status, request.priority, request.dueDate?.toISOString() || null,
-      0, now.toISOString(), now.toISOString(),
+      0, nowIso, nowIso,
       request.metadata ? JSON.stringify(request.metadata) : null
     );
 
@@ -200,12 +379,30 @@ export class Storage {
   }
 
   getRequest(id: string): Request | null {
-    const row = this.db.prepare('SELECT * FROM requests WHERE id = ?').get(id) as Record<string, unknown> | undefined;
+    const row = this.stmt('SELECT * FROM requests WHERE id = ?').get(id) as Record<string, unknown> | undefined;
     return row ? this.rowToRequest(row) : null;
   }
 
-  getPendingRequestsForUser(userId: string): Request[] {
+  // Requester name per request id, joined in SQL rather than fetched in two steps
+  getRequesterNamesByRequestIds(requestIds: string[]): Map<string, string> {
+    const names = new Map<string, string>();
+    const uniqueIds = [...new Set(requestIds)];
+    if (uniqueIds.length === 0) return names;
+
+    const placeholders = uniqueIds.map(() => '?').join(', ');
     const rows = this.db.prepare(`
+      SELECT r.id AS request_id, u.name AS name
+      FROM requests r JOIN users u ON u.id = r.from_user_id
+      WHERE r.id IN (${placeholders})
+    `).all(...uniqueIds) as { request_id: string; name: string }[];
+    for (const row of rows) {
+      names.set(row.request_id, row.name);
+    }
+    return names;
+  }
+
+  getPendingRequestsForUser(userId: string): Request[] {
+    const rows = this.stmt(`
       SELECT * FROM requests 
       WHERE to_user_id = ? AND status IN ('pending', 'in_progress', 'waiting_response')
       ORDER BY priority DESC, created_at ASC
@@ -214,13 +411,42 @@ export class Storage {
   }
 
   getRequestsByFromUser(userId: string): Request[] {
-    const rows = this.db.prepare(`
+    const rows = this.stmt(`
       SELECT * FROM requests WHERE from_user_id = ?
       ORDER BY created_at DESC
     `).all(userId) as Record<string, unknown>[];
     return rows.map(r => this.rowToRequest(r));
   }
 
+  getActiveRequestsByFromUser(userId: string, limit: number = -1): Request[] {
+    // LIMIT -1 means no limit in SQLite
+    const rows = this.stmt(`
+      SELECT * FROM requests
+      WHERE from_user_id = ? AND status NOT IN ('completed', 'cancelled')
+      ORDER BY created_at DESC
+      LIMIT ?
+    `).all(userId, limit) as Record<string, unknown>[];
+    return rows.map(r => this.rowToRequest(r));
+  }
+
+  // Active requests with follow-ups left whose last activity is older than the cutoff
+  getStaleRequestsByFromUser(userId: string, maxFollowUps: number, before: Date): Request[] {
+    const rows = this.stmt(`
+      SELECT * FROM requests
+      WHERE from_user_id = ? AND status NOT IN ('completed', 'cancelled')
+        AND follow_up_count < ? AND COALESCE(last_follow_up, created_at) <= ?
+      ORDER BY created_at DESC
+    `).all(userId, maxFollowUps, before.toISOString()) as Record<string, unknown>[];
+    return rows.map(r => this.rowToRequest(r));
+  }
+
+  countActiveRequestsByFromUser(userId: string): number {
+    return this.stmt(`
+      SELECT COUNT(*) FROM requests
+      WHERE from_user_id = ? AND status NOT IN ('completed', 'cancelled')
+    `).pluck().get(userId) as number;
+  }
+
   updateRequest(id: string, updates: Partial<Request>): void {
     const setClauses: string[] = ['updated_at = ?'];
     const values: unknown[] = [new Date().toISOString()];
@@ -255,7 +481,8 @@ export class Storage {
     }
 
     values.push(id);
-    this.db.prepare(`UPDATE requests SET ${setClauses.join(', ')} WHERE id = ?`).run(...values);
+    // At most one SQL text per combination of updated columns, so these cache well
+    this.stmt(`UPDATE requests SET ${setClauses.join(', ')} WHERE id = ?`).run(...values);
   }
 
   private rowToRequest(row: Record<string, unknown>): Request {
@@ -281,35 +508,53 @@ export class Storage {
     };
   }
 
+  // Record a response and close the request and its task together, at one timestamp
+  completeRequest(requestId: string, taskId: string, response: string): void {
+    const now = new Date().toISOString();
+    this.transaction(() => {
+      this.stmt(`
+        UPDATE requests SET status = 'completed', response = ?, completed_at = ?, updated_at = ?
+        WHERE id = ?
+      `).run(response, now, now, requestId);
+      this.stmt(`
+        UPDATE tasks SET status = 'completed', completed_at = ?, updated_at = ?
+        WHERE id = ?
+      `).run(now, now, taskId);
+    });
+  }
+
   // Task operations
   createTask(task: Omit<Task, 'id' | 'createdAt' | 'updatedAt'>): Task {
     const id = randomUUID();
     const now = new Date();
+    const nowIso = now.toISOString();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO tasks (id, user_id, request_id, title, description, status, priority, due_date, created_at, updated_at)
       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     `).run(
       id, task.userId, task.requestId, task.title, task.description || null,
       task.status, task.priority, task.dueDate?.toISOString() || null,
-      now.toISOString(), now.toISOString()
+      nowIso, nowIso
     );
 
     return { ...task, id, createdAt: now, updatedAt: now };
   }
 
-  getTasksForUser(userId: string, status?: Task['status']): Task[] {
-    let query = 'SELECT * FROM tasks WHERE user_id = ?';
-    const params: unknown[] = [userId];
-    
-    if (status) {
-      query += ' AND status = ?';
-      params.push(status);
-    }
-    
-    query += ' ORDER BY priority DESC, created_at ASC';
-    
-    const rows = this.db.prepare(query).all(...params) as Record<string, unknown>[];
+  getTasksForUser(userId: string, status?: Task['status'], limit: number = -1): Task[] {
+    // One fixed statement per shape, so both stay in the statement cache;
+    // LIMIT -1 means no limit in SQLite
+    const rows = (status
+      ? this.stmt(`
+          SELECT * FROM tasks WHERE user_id = ? AND status = ?
+          ORDER BY priority DESC, created_at ASC
+          LIMIT ?
+        `).all(userId, status, limit)
+      : this.stmt(`
+          SELECT * FROM tasks WHERE user_id = ?
+          ORDER BY priority DESC, created_at ASC
+          LIMIT ?
+        `).all(userId, limit)) as Record<string, unknown>[];
     return rows.map(r => ({
       id: r.id as string,
       userId: r.user_id as string,
@@ -325,21 +570,30 @@ export class Storage {
     }));
   }
 
+  countTasksForUser(userId: string, status?: Task['status']): number {
+    if (status) {
+      return this.stmt('SELECT COUNT(*) FROM tasks WHERE user_id = ? AND status = ?').pluck().get(userId, status) as number;
+    }
+    return this.stmt('SELECT COUNT(*) FROM tasks WHERE user_id = ?').pluck().get(userId) as number;
+  }
+
   updateTask(id: string, updates: Partial<Task>): void {
+    // completed_at and updated_at describe the same moment
+    const now = new Date().toISOString();
     const setClauses: string[] = ['updated_at = ?'];
-    const values: unknown[] = [new Date().toISOString()];
+    const values: unknown[] = [now];
 
     if (updates.status !== undefined) {
       setClauses.push('status = ?');
       values.push(updates.status);
       if (updates.status === 'completed') {
         setClauses.push('completed_at = ?');
-        values.push(new Date().toISOString());
+        values.push(now);
       }
     }
 
     values.push(id);
-    this.db.prepare(`UPDATE tasks SET ${setClauses.join(', ')} WHERE id = ?`).run(...values);
+    this.stmt(`UPDATE tasks SET ${setClauses.join(', ')} WHERE id = ?`).run(...values);
   }
 
   // Message operations
@@ -347,7 +601,7 @@ export class Storage {
     const id = randomUUID();
     const createdAt = new Date();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO messages (id, request_id, from_agent_id, to_agent_id, content, type, is_public, created_at, metadata)
       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     `).run(
@@ -360,7 +614,7 @@ export class Storage {
   }
 
   getMessagesForRequest(requestId: string): Message[] {
-    const rows = this.db.prepare(`
+    const rows = this.stmt(`
       SELECT * FROM messages WHERE request_id = ? ORDER BY created_at ASC
     `).all(requestId) as Record<string, unknown>[];
     
@@ -382,7 +636,7 @@ export class Storage {
     const id = randomUUID();
     const createdAt = new Date();
     
-    this.db.prepare(`
+    this.stmt(`
       INSERT INTO memories (id, type, content, source, tags, embedding, is_public, created_at, expires_at)
       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     `).run(
@@ -397,7 +651,7 @@ export class Storage {
 
   searchMemories(query: string, limit: number = 10): Memory[] {
     // Simple text search for now - can be replaced with vector search
-    const rows = this.db.prepare(`
+    const rows = this.stmt(`
       SELECT * FROM memories 
       WHERE is_public = 1 AND content LIKE ?
       ORDER BY created_at DESC
@@ -418,5 +672,28 @@ export class Storage {
 
   close() {
     this.db.close();
+    for (const [path, storage] of sharedStorages) {
+      if (storage === this) sharedStorages.delete(path);
+    }
+  }
+}
+
+// The CLI can start the Slack bot or dashboard in-process; give them all the
+// same connection instead of one per module
+const sharedStorages = new Map<string, Storage>();
+
+export function getSharedStorage(dbPath: string = './agentcomm.db'): Storage {
+  const key = resolve(dbPath);
+  let storage = sharedStorages.get(key);
+  if (!storage) {
+    storage = new Storage(dbPath);
+    sharedStorages.set(key, storage);
   }
+  return storage;
+}
+
+// Close the shared Storage for dbPath, if one is open, so the next
+// getSharedStorage opens the file afresh (e.g. after it has been deleted)
+export function closeSharedStorage(dbPath: string = './agentcomm.db'): void {
+  sharedStorages.get(resolve(dbPath))?.close();
 }
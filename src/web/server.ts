@@ -7,10 +7,10 @@
 import express from 'express';
 import { WebSocketServer, WebSocket } from 'ws';
 import { createServer } from 'http';
-import { Storage } from '../storage/database.js';
+import { getSharedStorage } from '../storage/database.js';
 import { CommunicationAgent, type AgentConfig } from '../core/agent.js';
-import type { LLMConfig } from '../core/types.js';
-import { existsSync, readFileSync } from 'fs';
+import type { LLMConfig, Event, Task } from '../core/types.js';
+import { readFileSync, statSync } from 'fs';
 import { homedir } from 'os';
 import { join } from 'path';
 import dotenv from 'dotenv';
@@ -27,16 +27,41 @@ const wss = new WebSocketServer({ server });
 app.use(express.json());
 app.use(express.static(join(import.meta.dirname, 'public')));
 
-// Load config
+// Load config. Every API request and WebSocket connection needs it, so keep
+// the parsed copy and only re-read the file when its mtime changes.
+let cachedConfig: { mtimeMs: number; value: any } | null = null;
+
 function loadConfig() {
-  if (existsSync(CONFIG_PATH)) {
-    return JSON.parse(readFileSync(CONFIG_PATH, 'utf-8'));
+  let mtimeMs: number;
+  try {
+    mtimeMs = statSync(CONFIG_PATH).mtimeMs;
+  } catch {
+    cachedConfig = null;
+    return null;
   }
-  return null;
+
+  if (cachedConfig?.mtimeMs !== mtimeMs) {
+    cachedConfig = { mtimeMs, value: JSON.parse(readFileSync(CONFIG_PATH, 'utf-8')) };
+  }
+  return cachedConfig.value;
 }
 
 // Initialize storage
-const storage = new Storage(DB_PATH);
+const storage = getSharedStorage(DB_PATH);
+
+const TASK_STATUSES: Task['status'][] = ['pending', 'in_progress', 'completed', 'deferred'];
+
+// Per-user routes share this guard; the resolved user id is passed on in res.locals
+function requireUser(req: express.Request, res: express.Response, next: express.NextFunction) {
+  const config = loadConfig();
+  if (!config?.userId) {
+    res.status(400).json({ error: 'Not configured' });
+    return;
+  }
+
+  res.locals.userId = config.userId;
+  next();
+}
 
 // API Routes
 app.get('/api/status', (req, res) => {
@@ -52,36 +77,54 @@ app.get('/api/users', (req, res) => {
   res.json(users);
 });
 
-app.get('/api/tasks', (req, res) => {
-  const config = loadConfig();
-  if (!config?.userId) {
-    return res.status(400).json({ error: 'Not configured' });
+app.get('/api/tasks', requireUser, (req, res) => {
+  // Optional ?status= filter so clients don't pull every task just to show one bucket
+  const status = req.query.status;
+  if (status !== undefined && !TASK_STATUSES.includes(status as Task['status'])) {
+    return res.status(400).json({ error: 'Invalid status' });
   }
-  
-  const tasks = storage.getTasksForUser(config.userId);
+
+  const tasks = storage.getTasksForUser(res.locals.userId, status as Task['status'] | undefined);
   res.json(tasks);
 });
 
-app.get('/api/requests', (req, res) => {
-  const config = loadConfig();
-  if (!config?.userId) {
-    return res.status(400).json({ error: 'Not configured' });
-  }
-  
-  const requests = storage.getRequestsByFromUser(config.userId);
+app.get('/api/requests', requireUser, (req, res) => {
+  const requests = storage.getRequestsByFromUser(res.locals.userId);
   res.json(requests);
 });
 
-app.get('/api/requests/incoming', (req, res) => {
-  const config = loadConfig();
-  if (!config?.userId) {
-    return res.status(400).json({ error: 'Not configured' });
-  }
-  
-  const requests = storage.getPendingRequestsForUser(config.userId);
+app.get('/api/requests/incoming', requireUser, (req, res) => {
+  const requests = storage.getPendingRequestsForUser(res.locals.userId);
   res.json(requests);
 });
 
+// WebSocket protocol
+type ServerMessage =
+  | { type: 'connected'; user: { name: string; id: string } }
+  | { type: 'chunk'; content: string }
+  | { type: 'response'; content: string }
+  | { type: 'event'; event: Event }
+  | { type: 'error'; message: string };
+
+interface ClientMessage {
+  type: 'chat';
+  content: string;
+}
+
+function send(ws: WebSocket, message: ServerMessage): void {
+  // Agent events can fire after the socket has gone away; don't bother encoding them
+  if (ws.readyState !== WebSocket.OPEN) return;
+  ws.send(JSON.stringify(message));
+}
+
+function parseClientMessage(data: WebSocket.RawData): ClientMessage | null {
+  const message = JSON.parse(data.toString());
+  if (message?.type === 'chat' && typeof message.content === 'string') {
+    return message;
+  }
+  return null;
+}
+
 // WebSocket for real-time chat
 const agents = new Map<WebSocket, CommunicationAgent>();
 
@@ -89,27 +132,29 @@ wss.on('connection', async (ws) => {
   const config = loadConfig();
   
   if (!config?.userId) {
-    ws.send(JSON.stringify({ type: 'error', message: 'Please run agentcomm setup first' }));
+    send(ws, { type: 'error', message: 'Please run agentcomm setup first' });
     ws.close();
     return;
   }
 
   const apiKey = config.apiKey || process.env.OPENAI_API_KEY || process.env.ANTHROPIC_API_KEY;
   if (!apiKey) {
-    ws.send(JSON.stringify({ type: 'error', message: 'API key not configured' }));
+    send(ws, { type: 'error', message: 'API key not configured' });
     ws.close();
     return;
   }
 
-  const user = storage.getUser(config.userId);
-  const agentRecord = storage.getAgentByUserId(config.userId);
+  const found = storage.getUserWithAgent(config.userId);
   
-  if (!user || !agentRecord) {
-    ws.send(JSON.stringify({ type: 'error', message: 'User not found' }));
+  if (!found?.agent) {
+    send(ws, { type: 'error', message: 'User not found' });
     ws.close();
     return;
   }
 
+  const user = found.user;
+  const agentRecord = found.agent;
+
   const llmConfig: LLMConfig = {
     provider: config.llmProvider,
     model: config.llmModel,
@@ -126,24 +171,32 @@ wss.on('connection', async (ws) => {
 
   // Set up event handlers
   agent.on('*', (event) => {
-    ws.send(JSON.stringify({ type: 'event', event }));
+    send(ws, { type: 'event', event });
   });
 
-  ws.send(JSON.stringify({ 
-    type: 'connected', 
-    user: { name: user.name, id: user.id } 
-  }));
+  send(ws, {
+    type: 'connected',
+    user: { name: user.name, id: user.id },
+  });
 
   ws.on('message', async (data) => {
     try {
-      const message = JSON.parse(data.toString());
+      const message = parseClientMessage(data);
       
-      if (message.type === 'chat') {
-        const response = await agent.handleUserMessage(message.content);
-        ws.send(JSON.stringify({ type: 'response', content: response }));
+      if (message) {
+        // Stream partial text as it arrives, then send the full reply to finish the turn
+        let response = '';
+        for await (const chunk of agent.streamUserMessage(message.content)) {
+          // Tab gone: leaving the loop returns the generator, which closes the
+          // provider stream instead of paying for the rest of the completion
+          if (ws.readyState !== WebSocket.OPEN) break;
+          response += chunk;
+          send(ws, { type: 'chunk', content: chunk });
+        }
+        send(ws, { type: 'response', content: response });
       }
     } catch (error) {
-      ws.send(JSON.stringify({ type: 'error', message: (error as Error).message }));
+      send(ws, { type: 'error', message: (error as Error).message });
     }
   });
 
@@ -508,6 +561,7 @@ function getDashboardHTML(): string {
     const tasksBadge = document.getElementById('tasks-badge');
     
     let connected = false;
+    let streaming = null;
     
     ws.onopen = () => {
       console.log('WebSocket connected');
@@ -521,11 +575,24 @@ function getDashboardHTML(): string {
         statusDot.classList.remove('offline');
         statusText.textContent = 'Connected as ' + data.user.name;
         loadTasks();
+      } else if (data.type === 'chunk') {
+        if (!streaming) {
+          removeTyping();
+          streaming = addMessage('', 'agent');
+        }
+        streaming.textContent += data.content;
+        messages.scrollTop = messages.scrollHeight;
       } else if (data.type === 'response') {
         removeTyping();
-        addMessage(data.content, 'agent');
+        if (streaming) {
+          streaming.textContent = data.content;
+          streaming = null;
+        } else {
+          addMessage(data.content, 'agent');
+        }
       } else if (data.type === 'error') {
         removeTyping();
+        streaming = null;
         statusDot.classList.add('offline');
         statusText.textContent = data.message;
         addMessage('Error: ' + data.message, 'system');
@@ -547,6 +614,7 @@ function getDashboardHTML(): string {
       div.textContent = content;
       messages.appendChild(div);
       messages.scrollTop = messages.scrollHeight;
+      return div;
     }
     
     function addTyping() {
@@ -580,9 +648,8 @@ function getDashboardHTML(): string {
     
     async function loadTasks() {
       try {
-        const res = await fetch('/api/tasks');
-        const tasks = await res.json();
-        const pending = tasks.filter(t => t.status === 'pending');
+        const res = await fetch('/api/tasks?status=pending');
+        const pending = await res.json();
         
         if (pending.length > 0) {
           tasksBadge.style.display = 'inline';